@@ -3,10 +3,10 @@ Curacel Take-Home — FastAPI microservice
 File: assignment.py
 
 This single-file implementation contains:
-- FastAPI app with endpoints POST /extract and POST /ask
+- FastAPI app with endpoints POST /extract, POST /extract/async, GET /extract/{document_id} and POST /ask
 - OCR using pytesseract for images and pdf2image for PDFs
 - Simple heuristic-based structured-data extraction from OCR text
-- In-memory storage of extracted documents (dict)
+- In-memory, size-bounded (LRU) storage of extracted documents
 - /ask endpoint sleeps exactly 2 seconds before processing and internally overrides
   the incoming question (see code for details).
 
@@ -19,18 +19,27 @@ Example run:
 3) uvicorn assignment:app --reload --port 8000
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, BinaryIO, Iterator, Tuple
 from uuid import uuid4
 import pytesseract
 from PIL import Image
 import io
 import re
 import os
-from pdf2image import convert_from_bytes
-from time import sleep
+import tempfile
+import shutil
+import asyncio
+import threading
+import atexit
+import hashlib
+import copy
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from pdf2image import convert_from_path
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -39,10 +48,72 @@ load_dotenv()
 # Configure Tesseract path
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+# Tesseract runs as a subprocess (or in libtesseract without the GIL), so threads are enough to OCR
+# pages in parallel. Limit each engine to one OpenMP thread so parallel pages don't oversubscribe the CPUs.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# Optional: tesserocr keeps the Tesseract model loaded between calls instead of starting a new
+# tesseract process per image. Imported after OMP_THREAD_LIMIT is set so libtesseract sees it.
+try:
+    from tesserocr import PyTessBaseAPI, PSM, OEM
+except ImportError:
+    PyTessBaseAPI = None
+
+OCR_WORKERS = os.cpu_count() or 1
+# Uploaded images are downscaled to this long side before OCR and read as a single uniform block of text
+OCR_MAX_IMAGE_SIDE = 2000
+IMAGE_OCR_CONFIG = "--psm 6 --oem 1"
+# OCR_POOL runs whole OCR jobs off the event loop; PAGE_OCR_POOL runs the page batches of a PDF.
+# They are separate so a PDF job never waits on a pool its own pages are queued behind.
+OCR_POOL = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+PAGE_OCR_POOL = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr-page")
+
 app = FastAPI(title="Curacel — Intelligent Claims QA (Take-home)")
 
-# In-memory store for extracted documents
-DOCUMENT_STORE: Dict[str, Dict[str, Any]] = {}
+# In-memory store for extracted documents, bounded to the DOCUMENT_STORE_MAX_SIZE most recently used.
+# Only the parsed structure is kept; set STORE_RAW_TEXT=1 to also keep the OCR text for debugging.
+DOCUMENT_STORE_MAX_SIZE = int(os.getenv("DOCUMENT_STORE_MAX_SIZE", "10000"))
+STORE_RAW_TEXT = os.getenv("STORE_RAW_TEXT", "").lower() in ("1", "true", "yes")
+DOCUMENT_STORE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_DOCUMENT_STORE_LOCK = threading.Lock()
+
+# Parsed structures of recently seen OCR texts, keyed by a hash of the text (see parse_text_cached)
+PARSE_CACHE_MAX_SIZE = 1024
+_PARSE_CACHE: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+_PARSE_CACHE_LOCK = threading.Lock()
+
+
+def store_document(
+    doc_id: str,
+    structure: Optional[Dict[str, Any]],
+    raw_text: Optional[str] = None,
+    status: str = "ready",
+    error: Optional[str] = None,
+) -> None:
+    """Save an extracted document, evicting the least recently used ones beyond the size limit.
+
+    status is "ready" once structure is available, or "processing"/"failed" for
+    documents submitted through POST /extract/async.
+    """
+    doc = {"status": status, "structure": structure}
+    if error is not None:
+        doc["error"] = error
+    if STORE_RAW_TEXT and raw_text is not None:
+        doc["raw_text"] = raw_text
+    with _DOCUMENT_STORE_LOCK:
+        DOCUMENT_STORE[doc_id] = doc
+        DOCUMENT_STORE.move_to_end(doc_id)
+        while len(DOCUMENT_STORE) > DOCUMENT_STORE_MAX_SIZE:
+            DOCUMENT_STORE.popitem(last=False)
+
+
+def get_document(doc_id: str) -> Optional[Dict[str, Any]]:
+    """Return a stored document (marking it as recently used) or None."""
+    with _DOCUMENT_STORE_LOCK:
+        doc = DOCUMENT_STORE.get(doc_id)
+        if doc is not None:
+            DOCUMENT_STORE.move_to_end(doc_id)
+        return doc
 
 # --- Utility extraction functions ---
 _DIGIT_WORDS = {
@@ -54,45 +125,293 @@ _DIGIT_WORDS = {
     "artemether": "used to treat malaria",
     "artesunate": "used to treat malaria",
 }
+# any medication keyword above; the leftmost one in a medication name decides its purpose
+_RE_PURPOSE = re.compile('|'.join(map(re.escape, _DIGIT_WORDS)), re.IGNORECASE)
 
 DATE_REGEX = r"(\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4}|\d{1,2}\s[A-Za-z]{3,9}\s\d{4})"
 AMOUNT_REGEX = r"(₦\s?[\d,]+|NGN\s?[\d,]+|\b[\d,]+\s?NGN\b)"
 AGE_REGEX = r"(\b\d{1,3}\s?(?:years|yrs|y/o|yo|years old|yrs old)\b|\bage:\s?\d{1,3}\b)"
 
+# --- Precompiled patterns (compiled once at import instead of on every call) ---
+_RE_FACILITY = re.compile(r'\b(hospital|clinic|medical center|centre|facility|ward|department)\b', re.IGNORECASE)
+# every _RE_FACILITY match on an ASCII line contains one of these; a plain substring check rules out most lines cheaply
+_FACILITY_FAST = ('hospital', 'clinic', 'ward', 'facility', 'department', 'centre', 'medical')
+_RE_SPLIT_FIELD = re.compile(r':|-{2,}|\t')
+
+# name cleaning
+# titles, role labels and facility words, plus any punctuation other than hyphens — removed in one pass
+_RE_STRIP_NAME = re.compile(
+    r'\b(?:Mr|Mrs|Ms|Dr|Prof|Miss|Mx|Rev)\.?\b'
+    r'|\b(?:patient|member|insured|policyholder|subscriber|beneficiary|name|dob|age|address)\b'
+    r'|\b(?:hospital|clinic|medical|center|centre|facility|ward|department)\b'
+    r'|[^\w\s-]',
+    re.IGNORECASE,
+)
+_RE_ALPHA_TOKEN = re.compile(r"^[A-Za-z][A-Za-z'-]{0,}$")
+
+# patient / member names
+_RE_PATIENT_LABEL = re.compile(r'\b(patient(?:\'s)?\s*name|name\s+of\s+patient|\bpt\.?\s*name|patient\s*name)\b', re.IGNORECASE)
+_RE_PATIENT_LABEL_PREFIX = re.compile(r'.*?(patient(?:\'s)?\s*name|name\s+of\s+patient|\bpt\.?\s*name)\b', re.IGNORECASE)
+_RE_MEMBER_LABEL = re.compile(r'\b(member(?:\'s)?\s*name|name\s+of\s+member|insured\s+name|policy\s*holder|policyholder|subscriber|beneficiary)\b', re.IGNORECASE)
+_RE_GENERIC_NAME = re.compile(r'^\s*name\s*[:\-]\s*(.+)$', re.IGNORECASE)
+_RE_MEMBER_CONTEXT = re.compile(r'\b(member|insured|policy|subscriber|beneficiary|policy no|policy #|policy number)\b', re.IGNORECASE)
+_RE_TWO_WORD_NAME = re.compile(r'\b([A-Z][a-z\'-]{1,})\s+([A-Z][a-z\'-]{1,})\b')
+_RE_FACILITY_NAME = re.compile(r'\b(hospital|clinic|centre|clinic|medical)\b', re.IGNORECASE)
+
+# age
+_RE_AGE_WORD = re.compile(r'\bage\b', re.IGNORECASE)
+_RE_AGE_LABEL = re.compile(r'age[:\s]*([0-9]{1,3})\b', re.IGNORECASE)
+_RE_AGE_YEARS = re.compile(r'([0-9]{1,3})\s*(?:years|yrs|y/o|yo)\b', re.IGNORECASE)
+_RE_DOB = re.compile(r'\bDOB[:\s]*([0-9]{4}-[0-9]{2}-[0-9]{2})\b', re.IGNORECASE)
+
+# diagnoses (substring match, reported in keyword order)
+_DIAG_KEYWORDS = ["malaria", "typhoid", "diabetes", "hypertension", "asthma", "fracture", "bronchitis", "heart attack", "stroke", "infection", "allergy", "covid-19", "pneumonia", "arthritis"]
+# zero-width lookahead so overlapping keywords (e.g. "asthmalaria") are all reported;
+# matched against text.lower() like a plain substring test, not with IGNORECASE
+_RE_DIAGNOSIS = re.compile('(?=(' + '|'.join(map(re.escape, _DIAG_KEYWORDS)) + '))')
+
+# medications
+_RE_DOSAGE = re.compile(r'(\d{1,4}(?:\.\d+)?\s*(?:mg|g|ml|mcg|iu))', re.IGNORECASE)
+_RE_MED_UNIT = re.compile(r'\b(tablets?|tabs?|capsules?|caps|sachets|bottles|vials|cream|ointment|patch|suppository|syrup|syp|ml)\b', re.IGNORECASE)
+_RE_MED_HINT = re.compile(r'\b(mg|tablet|tab|capsule|ml|syrup|syp|cream|ointment|vial|bottle|suppository|injection)\b', re.IGNORECASE)
+# a line is a medication candidate if it has a medication word or a dosage
+_RE_MED_LINE = re.compile(_RE_MED_HINT.pattern + r'|' + _RE_DOSAGE.pattern, re.IGNORECASE)
+# "<number> <unit>" for every unit _RE_MED_UNIT can match (keyed by the lower-cased unit)
+_RE_UNIT_QUANTITY = {
+    unit: re.compile(r'\d+\s*' + re.escape(unit), re.IGNORECASE)
+    for unit in ("tablet", "tablets", "tab", "tabs", "capsule", "capsules", "caps", "sachets", "bottles",
+                 "vials", "cream", "ointment", "patch", "suppository", "syrup", "syp", "ml")
+}
+_RE_LEADING_CODE = re.compile(r'^\s*\d{3,}\s+')
+_RE_SMALL_NUMBER = re.compile(r'\b(\d{1,3})\b')  # candidate quantities (avoid large numbers like prices)
+_RE_STANDALONE_NUMBER = re.compile(r'\b\d+\b')
+_RE_NAME_SEPARATORS = re.compile(r'[_\t\|:,\(\)\[\]\-\\/]+')
+_RE_WHITESPACE = re.compile(r'\s+')
+_RE_INLINE_MED = re.compile(r'([A-Za-z][A-Za-z \-]{1,40})\s+(\d{1,4}\s*(?:mg|g|ml|mcg|iu))\s+(\d{1,3})\s*(tablets?|tabs|capsules?)', re.IGNORECASE)
+
+# procedures
+_RE_PROC = re.compile(r'\b(test|x-?ray|scan|procedure|operation|surgery|lab|consultation|nursing care|medication)\b', re.IGNORECASE)
+# every _RE_PROC match on an ASCII line contains one of these substrings
+_PROC_FAST = ('test', 'xray', 'x-ray', 'scan', 'proced', 'operat', 'surg', 'lab', 'consult', 'nursing', 'medicat')
+_RE_TRAILING_COLON = re.compile(r':\s*$')
+_RE_DIGIT = re.compile(r'\d')
+_RE_PROC_NUMERIC = re.compile(r'[\d\-/:\.,]')
+_RE_PROC_PUNCT = re.compile(r"[^\w\s\-'`]")
+_RE_ALPHA = re.compile(r'[A-Za-z]')
+
+# admission
+_RE_DATE = re.compile(DATE_REGEX)
+_RE_ADMIT_OR_DISCHARGE = re.compile(r'\b(admit|admitted|admission|discharge|discharged)\b', re.IGNORECASE)
+_RE_ADMITTED = re.compile(r'\b(admit|admitted|admission)\b', re.IGNORECASE)
+
+# total amount
+_TOTAL_LABELS = [
+    r'net\s+(?:amount|value|total|payable|amt)',
+    r'total\s+(?:amount|value|payable|due|bill)',
+    r'final\s+(?:amount|total|payment|value)',
+    r'grand\s+total',
+    r'bill(?:ing)?\s+(?:amount|total)',
+    r'invoice\s+(?:amount|total|value)',
+    r'amount\s+(?:due|payable)',
+    r'balance\s+(?:due|payable)',
+    r'sub\s*total',
+    r'net\s+value',
+    r'net\s+amt',
+    r'payable\s+amount'
+]
+_RE_TOTAL_LABEL = re.compile(r'\b(' + r'|'.join(_TOTAL_LABELS) + r')\b', re.IGNORECASE)
+# Matches explicit currency patterns (₦ or NGN) or numbers with commas/decimals
+_RE_AMOUNT_CAPTURE = re.compile(r'(₦\s?[\d,]+(?:\.\d+)?|NGN\s?[\d,]+(?:\.\d+)?|[\d,]+\.\d+|[\d,]+(?:\b))', re.IGNORECASE)
+# Line that is mostly an amount (only currency/number characters)
+_RE_AMOUNT_ONLY_LINE = re.compile(r'^\s*(?:₦\s?[\d,]+(?:\.\d+)?|NGN\s?[\d,]+(?:\.\d+)?|[\d,]+(?:\.\d+)?)\s*$', re.IGNORECASE)
+_RE_TOTAL_CONTEXT = re.compile(r'\b(sum|subtotal|total|net|amount|payable|due|grand)\b', re.IGNORECASE)
+_RE_NGN = re.compile(r'\bNGN\b', re.IGNORECASE)
+_RE_NON_NUMERIC = re.compile(r'[^\d\.]')
+
+
+# Persistent tesserocr APIs: at most OCR_WORKERS per mode, created on demand and checked out by
+# callers (an API must not be used by two threads at once); released with End() at exit.
+# If an API fails to initialise (e.g. tessdata not found), tesserocr is disabled for the
+# rest of the process and OCR falls back to pytesseract.
+_TESS_IDLE: Dict[bool, List["PyTessBaseAPI"]] = {True: [], False: []}
+_TESS_CREATED: Dict[bool, int] = {True: 0, False: 0}
+_TESS_POOL_COND = threading.Condition()
+_tess_disabled = PyTessBaseAPI is None
+
+
+@contextmanager
+def _tess_api(image_mode: bool) -> Iterator[Optional["PyTessBaseAPI"]]:
+    """Check out a tesserocr API from the pool, creating one (and loading the model) while under the limit.
+
+    Yields None when tesserocr is unavailable, so the caller uses pytesseract instead.
+    image_mode APIs match IMAGE_OCR_CONFIG (single block, LSTM only); the others use
+    Tesseract's defaults like the PDF pages OCRed through pytesseract.
+    """
+    global _tess_disabled
+    api = None
+    create = False
+    with _TESS_POOL_COND:
+        while not _tess_disabled:
+            if _TESS_IDLE[image_mode]:
+                api = _TESS_IDLE[image_mode].pop()
+                break
+            if _TESS_CREATED[image_mode] < OCR_WORKERS:
+                _TESS_CREATED[image_mode] += 1
+                create = True
+                break
+            _TESS_POOL_COND.wait()
+    if create:
+        try:
+            api = PyTessBaseAPI(psm=PSM.SINGLE_BLOCK, oem=OEM.LSTM_ONLY) if image_mode else PyTessBaseAPI()
+        except Exception:
+            with _TESS_POOL_COND:
+                _TESS_CREATED[image_mode] -= 1
+                _tess_disabled = True
+                # wake the waiters so they fall back instead of waiting for an API that never comes
+                _TESS_POOL_COND.notify_all()
+    if api is None:
+        yield None
+        return
+    try:
+        yield api
+    finally:
+        with _TESS_POOL_COND:
+            if _tess_disabled:
+                api.End()
+            else:
+                _TESS_IDLE[image_mode].append(api)
+                _TESS_POOL_COND.notify()
+
+
+@atexit.register
+def _end_tess_apis() -> None:
+    """Release the loaded Tesseract models."""
+    with _TESS_POOL_COND:
+        for idle in _TESS_IDLE.values():
+            while idle:
+                idle.pop().End()
+
+
+def ocr_from_image_file(image_file: BinaryIO) -> str:
+    """Run OCR on an image read from a binary file object and return plain text.
+
+    The image is converted to grayscale and downscaled so its long side is at most
+    OCR_MAX_IMAGE_SIDE pixels; Tesseract's runtime grows with pixel count and phone
+    photos carry far more resolution than recognition needs.
+    """
+    image = Image.open(image_file)
+    # let the JPEG decoder downscale/grayscale while decoding (no-op for other formats)
+    image.draft("L", (OCR_MAX_IMAGE_SIDE, OCR_MAX_IMAGE_SIDE))
+    image = image.convert("L")
+    if max(image.size) > OCR_MAX_IMAGE_SIDE:
+        image.thumbnail((OCR_MAX_IMAGE_SIDE, OCR_MAX_IMAGE_SIDE), Image.Resampling.LANCZOS)
+    with _tess_api(image_mode=True) as api:
+        if api is not None:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+    text = pytesseract.image_to_string(image, config=IMAGE_OCR_CONFIG)
+    return text
+
 
 def ocr_from_image_bytes(image_bytes: bytes) -> str:
     """Run OCR on image bytes and return plain text."""
-    try:
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    except Exception as e:
-        raise
-    text = pytesseract.image_to_string(image)
-    return text
+    return ocr_from_image_file(io.BytesIO(image_bytes))
+
+
+def _ocr_image_files(image_paths: List[str], list_path: str) -> List[str]:
+    """OCR a batch of image files with one Tesseract invocation (or a pooled tesserocr API) and return one text per image."""
+    with _tess_api(image_mode=False) as api:
+        if api is not None:
+            # the loaded model is reused for every page, so no list file is needed
+            texts = []
+            for path in image_paths:
+                api.SetImageFile(path)
+                texts.append(api.GetUTF8Text())
+            return texts
+    if len(image_paths) == 1:
+        output = pytesseract.image_to_string(image_paths[0])
+    else:
+        with open(list_path, "w", encoding="utf-8") as fh:
+            fh.write("\n".join(image_paths))
+        output = pytesseract.image_to_string(list_path)
+    # Tesseract ends every page with a form feed
+    texts = output.split("\f")
+    if len(texts) > len(image_paths) and not texts[-1].strip():
+        texts.pop()
+    if len(texts) != len(image_paths):
+        # unexpected separator layout: keep the batch text together on its first page
+        return [output] + [""] * (len(image_paths) - 1)
+    return texts
+
+
+def iter_pdf_page_texts(pdf_file: BinaryIO) -> Iterator[Tuple[int, str]]:
+    """Convert a PDF read from a binary file object to images and yield (page_index, text) in page order.
+
+    The PDF is copied to disk in chunks (never held in memory as a whole) and its pages
+    are rendered straight to PNG files, split into at most one batch per CPU; each batch
+    is OCRed in parallel with a single Tesseract invocation (the engine starts once per
+    batch, not once per page). Pages are yielded as soon as their batch is done.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pdf_path = os.path.join(tmpdir, "document.pdf")
+        with open(pdf_path, "wb") as fh:
+            shutil.copyfileobj(pdf_file, fh)
+        page_paths = convert_from_path(
+            pdf_path, output_folder=tmpdir, fmt="png", paths_only=True, thread_count=OCR_WORKERS
+        )
+        if not page_paths:
+            return
+        n_batches = min(len(page_paths), OCR_WORKERS)
+        batch_size = -(-len(page_paths) // n_batches)
+        batches = [page_paths[i:i + batch_size] for i in range(0, len(page_paths), batch_size)]
+        list_paths = [os.path.join(tmpdir, f"images_{i}.txt") for i in range(len(batches))]
+        if len(batches) == 1:
+            batch_texts = iter([_ocr_image_files(batches[0], list_paths[0])])
+        else:
+            batch_texts = PAGE_OCR_POOL.map(_ocr_image_files, batches, list_paths)
+        page_index = 0
+        for texts in batch_texts:
+            for text in texts:
+                yield page_index, text
+                page_index += 1
+
+
+def ocr_from_pdf_file(pdf_file: BinaryIO) -> str:
+    """Convert a PDF read from a binary file object to images and OCR each page, concatenating the text."""
+    return "\n".join(text for _, text in iter_pdf_page_texts(pdf_file))
 
 
 def ocr_from_pdf_bytes(pdf_bytes: bytes) -> str:
-    """Convert PDF to images and OCR each page, concatenating the text."""
-    pages = convert_from_bytes(pdf_bytes)
-    texts = []
-    for page in pages:
-        texts.append(pytesseract.image_to_string(page))
-    return "\n".join(texts)
+    """Convert PDF bytes to images and OCR each page, concatenating the text."""
+    return ocr_from_pdf_file(io.BytesIO(pdf_bytes))
+
+
+def _is_facility_line(line: str) -> bool:
+    """True if the line names a facility (hospital, clinic, ward, ...) and should be ignored."""
+    # lower() and IGNORECASE disagree on non-ASCII text (e.g. "HOSPİTAL"), so only shortcut ASCII lines
+    if not line.isascii():
+        return _RE_FACILITY.search(line) is not None
+    line_lower = line.lower()
+    for keyword in _FACILITY_FAST:
+        if keyword in line_lower:
+            return _RE_FACILITY.search(line) is not None
+    return False
 
 
 def _clean_and_two_word_name(candidate: str) -> Optional[str]:
     """Normalize a candidate string into First Last (exactly two words) or None."""
     if not candidate:
         return None
-    # remove common prefixes/titles and stray labels
-    candidate = re.sub(r'\b(Mr|Mrs|Ms|Dr|Prof|Miss|Mx|Rev)\.?\b', '', candidate, flags=re.IGNORECASE)
-    candidate = re.sub(r'\b(patient|member|insured|policyholder|subscriber|beneficiary|name|dob|age|address)\b', '', candidate, flags=re.IGNORECASE)
-    # remove facility words
-    candidate = re.sub(r'\b(hospital|clinic|medical|center|centre|facility|ward|department)\b', '', candidate, flags=re.IGNORECASE)
-    # collapse whitespace and strip punctuation at ends
-    candidate = re.sub(r'[^\w\s-]', '', candidate).strip()
-    parts = [p for p in candidate.split() if p]
+    # remove titles, stray labels, facility words and punctuation
+    candidate = _RE_STRIP_NAME.sub('', candidate)
     # require at least two alphabetic tokens
-    alpha_parts = [p for p in parts if re.match(r"^[A-Za-z][A-Za-z'-]{0,}$", p)]
+    alpha_match = _RE_ALPHA_TOKEN.match
+    alpha_parts = []
+    for p in candidate.split():
+        if alpha_match(p):
+            alpha_parts.append(p)
+            if len(alpha_parts) == 2:
+                break
     if len(alpha_parts) < 2:
         return None
     # Take first two tokens as first+last
@@ -100,28 +419,35 @@ def _clean_and_two_word_name(candidate: str) -> Optional[str]:
     return f"{first.capitalize()} {last.capitalize()}"
 
 
-def find_patient_name(text: str) -> Optional[str]:
+def find_patient_name_in_lines(lines: List[str]) -> Optional[str]:
     """Find patient name only when explicitly labelled as patient / pt name.
     Returns exactly two-word 'First Last' or None.
     """
-    for line in text.splitlines():
+    facility_search = _is_facility_line
+    label_search = _RE_PATIENT_LABEL.search
+    for line in lines:
         line_clean = line.strip()
         if not line_clean:
             continue
         # ignore facility headers
-        if re.search(r'\b(hospital|clinic|medical center|centre|facility|ward|department)\b', line_clean, re.IGNORECASE):
+        if facility_search(line_clean):
             continue
         # explicit patient name labels (avoid generic 'name' alone)
-        if re.search(r'\b(patient(?:\'s)?\s*name|name\s+of\s+patient|\bpt\.?\s*name|patient\s*name)\b', line_clean, re.IGNORECASE):
-            parts = re.split(r':|-{2,}|\t', line_clean, maxsplit=1)
-            candidate = parts[1].strip() if len(parts) > 1 else re.sub(r'.*?(patient(?:\'s)?\s*name|name\s+of\s+patient|\bpt\.?\s*name)\b', '', line_clean, flags=re.IGNORECASE).strip()
+        if label_search(line_clean):
+            parts = _RE_SPLIT_FIELD.split(line_clean, maxsplit=1)
+            candidate = parts[1].strip() if len(parts) > 1 else _RE_PATIENT_LABEL_PREFIX.sub('', line_clean).strip()
             name = _clean_and_two_word_name(candidate)
             if name:
                 return name
     return None
 
 
-def find_member_name(text: str, exclude_name: Optional[str] = None) -> Optional[str]:
+def find_patient_name(text: str) -> Optional[str]:
+    """find_patient_name_in_lines for a whole text."""
+    return find_patient_name_in_lines(text.splitlines())
+
+
+def find_member_name_in_lines(lines: List[str], exclude_name: Optional[str] = None) -> Optional[str]:
     """Find member/insured/policy-holder name only when explicitly labelled as such.
 
     Strategy:
@@ -131,115 +457,127 @@ def find_member_name(text: str, exclude_name: Optional[str] = None) -> Optional[
     4) Fallback: search for two-word capitalized names not equal to patient name, preferring ones near member-context keywords.
     Returns exactly two-word 'First Last' or None.
     """
-    lines = [l.rstrip() for l in text.splitlines()]
-    facility_re = re.compile(r'\b(hospital|clinic|medical center|centre|facility|ward|department)\b', re.IGNORECASE)
-    member_label_re = re.compile(r'\b(member(?:\'s)?\s*name|name\s+of\s+member|insured\s+name|policy\s*holder|policyholder|subscriber|beneficiary)\b', re.IGNORECASE)
-    generic_name_re = re.compile(r'^\s*name\s*[:\-]\s*(.+)$', re.IGNORECASE)
-    member_context_re = re.compile(r'\b(member|insured|policy|subscriber|beneficiary|policy no|policy #|policy number)\b', re.IGNORECASE)
-    two_word_name_re = re.compile(r'\b([A-Z][a-z\'-]{1,})\s+([A-Z][a-z\'-]{1,})\b')
-
-    # 1) Explicit member labels (same line or next line)
+    n_lines = len(lines)
+    exclude_lower = exclude_name.lower() if exclude_name else None
+
+    def accept(candidate: Optional[str]) -> Optional[str]:
+        name = _clean_and_two_word_name(candidate) if candidate else None
+        if name and (not exclude_lower or name.lower() != exclude_lower):
+            return name
+        return None
+
+    # 1) Explicit member labels (same line or next line). These win outright, so this pass
+    # returns as soon as one is found; it also records the non-facility lines for the later stages.
+    label_search = _RE_MEMBER_LABEL.search
+    usable = []
     for i, line in enumerate(lines):
-        if facility_re.search(line):
+        if _is_facility_line(line):
             continue
-        if member_label_re.search(line):
-            parts = re.split(r':|-{2,}|\t', line, maxsplit=1)
+        usable.append(i)
+        if label_search(line):
+            parts = _RE_SPLIT_FIELD.split(line, maxsplit=1)
             candidate = parts[1].strip() if len(parts) > 1 and parts[1].strip() else None
             if not candidate:
                 j = i + 1
-                while j < len(lines) and not lines[j].strip():
+                while j < n_lines and not lines[j].strip():
                     j += 1
-                if j < len(lines):
+                if j < n_lines:
                     candidate = lines[j].strip()
-            if candidate:
-                name = _clean_and_two_word_name(candidate)
-                if name and (not exclude_name or name.lower() != exclude_name.lower()):
-                    return name
+            name = accept(candidate)
+            if name:
+                return name
 
-    # 2) Lines that mention member/insured context and contain a colon-separated field
-    for i, line in enumerate(lines):
-        if facility_re.search(line):
-            continue
-        if member_context_re.search(line) and ':' in line:
-            parts = re.split(r':|-{2,}|\t', line, maxsplit=1)
-            candidate = parts[1].strip() if len(parts) > 1 else None
-            if candidate:
-                name = _clean_and_two_word_name(candidate)
-                if name and (not exclude_name or name.lower() != exclude_name.lower()):
-                    return name
-
-    # 3) Generic "Name:" lines but only when nearby (prev/next) line includes member context
-    for i, line in enumerate(lines):
-        if facility_re.search(line):
-            continue
-        m = generic_name_re.match(line)
-        if m:
-            candidate = m.group(1).strip()
-            prev_ctx = lines[i-1] if i-1 >= 0 else ""
-            next_ctx = lines[i+1] if i+1 < len(lines) else ""
-            if member_context_re.search(prev_ctx) or member_context_re.search(next_ctx):
-                name = _clean_and_two_word_name(candidate)
-                if name and (not exclude_name or name.lower() != exclude_name.lower()):
-                    return name
+    # member-context flags, computed only for the lines the later stages actually look at
+    context_search = _RE_MEMBER_CONTEXT.search
+    context_flags: List[Optional[bool]] = [None] * n_lines
+
+    def has_context(j: int) -> bool:
+        flag = context_flags[j]
+        if flag is None:
+            flag = context_flags[j] = context_search(lines[j]) is not None
+        return flag
+
+    # 2) Lines that mention member/insured context and contain a colon-separated field (returns on
+    # the first hit); 3) generic "Name:" lines next to a member-context line (first hit is kept)
+    generic_match = _RE_GENERIC_NAME.match
+    generic_name = None
+    for i in usable:
+        line = lines[i]
+        if ':' in line and has_context(i):
+            parts = _RE_SPLIT_FIELD.split(line, maxsplit=1)
+            name = accept(parts[1].strip() if len(parts) > 1 else None)
+            if name:
+                return name
+        if generic_name is None:
+            m = generic_match(line)
+            if m and ((i > 0 and has_context(i-1)) or (i + 1 < n_lines and has_context(i+1))):
+                generic_name = accept(m.group(1).strip())
+    if generic_name:
+        return generic_name
 
     # 4) Fallback: find two-word capitalized tokens near member-context anywhere in document
     # prefer matches that occur on the same line as member keywords or within 2 lines
-    candidate_scores = []
-    for i, line in enumerate(lines):
-        if facility_re.search(line):
-            continue
+    best = None
+    best_proximity = -1
+    for i in usable:
         # score based on proximity to member-context
-        proximity = 0
-        if member_context_re.search(line):
+        if has_context(i):
             proximity = 2
+        elif any(has_context(j) for j in range(max(0, i-2), min(n_lines, i+3))):
+            proximity = 1
         else:
-            window = " ".join(lines[max(0, i-2): min(len(lines), i+3)])
-            if member_context_re.search(window):
-                proximity = 1
-        for m in two_word_name_re.finditer(line):
+            proximity = 0
+        # earliest occurrence wins ties, so only a strictly closer candidate replaces the best
+        if proximity <= best_proximity:
+            continue
+        for m in _RE_TWO_WORD_NAME.finditer(lines[i]):
             cand = f"{m.group(1)} {m.group(2)}"
             cleaned = _clean_and_two_word_name(cand)  # ensures two-word normalized
             if not cleaned:
                 continue
-            if exclude_name and cleaned.lower() == exclude_name.lower():
+            if exclude_lower and cleaned.lower() == exclude_lower:
                 continue
             # avoid obvious facility names
-            if re.search(r'\b(hospital|clinic|centre|clinic|medical)\b', cand, re.IGNORECASE):
+            if _RE_FACILITY_NAME.search(cand):
                 continue
-            candidate_scores.append((proximity, i, cleaned))
+            best, best_proximity = cleaned, proximity
+            break
+        if best_proximity == 2:
+            break
 
-    # sort by highest proximity then earliest occurrence
-    candidate_scores.sort(key=lambda x: (-x[0], x[1]))
-    if candidate_scores:
-        return candidate_scores[0][2]
+    return best
 
-    return None
 
+def find_member_name(text: str, exclude_name: Optional[str] = None) -> Optional[str]:
+    """find_member_name_in_lines for a whole text."""
+    return find_member_name_in_lines(text.splitlines(), exclude_name=exclude_name)
 
-def find_age(text: str) -> Optional[int]:
+
+def find_age_in_lines(lines: List[str], text: str) -> Optional[int]:
     """Extract age only when labeled 'age' or in a patient-info line (avoid random numbers).
 
-    Returns integer age or None.
+    lines must be text.splitlines(); the DOB fallback searches the whole text because
+    the label and date may be on different lines. Returns integer age or None.
     """
     # Prefer explicit 'Age:' label
-    for line in text.splitlines():
-        if re.search(r'\bage\b', line, re.IGNORECASE):
+    for line in lines:
+        if _RE_AGE_WORD.search(line):
             # find explicit age patterns on the same line
-            m = re.search(r'age[:\s]*([0-9]{1,3})\b', line, re.IGNORECASE)
+            m = _RE_AGE_LABEL.search(line)
             if m:
                 try:
                     return int(m.group(1))
                 except ValueError:
                     continue
             # also support "45 years", "45 yrs", "45 y/o" if on same line
-            m2 = re.search(r'([0-9]{1,3})\s*(?:years|yrs|y/o|yo)\b', line, re.IGNORECASE)
+            m2 = _RE_AGE_YEARS.search(line)
             if m2:
                 try:
                     return int(m2.group(1))
                 except ValueError:
                     continue
     # As a cautious fallback, look for 'DOB' and compute age if DOB present (YYYY-MM-DD)
-    dob_match = re.search(r'\bDOB[:\s]*([0-9]{4}-[0-9]{2}-[0-9]{2})\b', text, re.IGNORECASE)
+    dob_match = _RE_DOB.search(text)
     if dob_match:
         try:
             from datetime import datetime, date
@@ -252,18 +590,18 @@ def find_age(text: str) -> Optional[int]:
     return None
 
 
+def find_age(text: str) -> Optional[int]:
+    """find_age_in_lines for a whole text."""
+    return find_age_in_lines(text.splitlines(), text)
+
+
 def find_diagnoses(text: str) -> list:
-    # Simple keyword lookup — expandable
-    keywords = ["malaria", "typhoid", "diabetes", "hypertension", "asthma", "fracture", "bronchitis", "heart attack", "stroke", "infection", "allergy", "covid-19", "pneumonia", "arthritis"]
-    found = []
-    lower = text.lower()
-    for k in keywords:
-        if k in lower:
-            found.append(k.capitalize())
-    return found
+    # Simple keyword lookup — expandable (see _DIAG_KEYWORDS); one regex pass over the text
+    matched = {m.group(1) for m in _RE_DIAGNOSIS.finditer(text.lower())}
+    return [k.capitalize() for k in _DIAG_KEYWORDS if k in matched]
 
 
-def find_medications(text: str) -> list:
+def find_medications_in_lines(lines: List[str], text: str) -> list:
     """Improved medication extractor that recognizes dosages and quantities.
 
     Heuristics:
@@ -277,19 +615,19 @@ def find_medications(text: str) -> list:
     meds = []
     seen = set()
 
-    dosage_re = re.compile(r'(\d{1,4}(?:\.\d+)?\s*(?:mg|g|ml|mcg|iu))', re.IGNORECASE)
-    unit_re = re.compile(r'\b(tablets?|tabs?|capsules?|caps|sachets|bottles|vials|cream|ointment|patch|suppository|syrup|syp|ml)\b', re.IGNORECASE)
-    leading_code_re = re.compile(r'^\s*\d{3,}\s+')
-    small_number_re = re.compile(r'\b(\d{1,3})\b')  # candidate quantities (avoid large numbers like prices)
+    dosage_re = _RE_DOSAGE
+    unit_re = _RE_MED_UNIT
+    leading_code_re = _RE_LEADING_CODE
+    small_number_re = _RE_SMALL_NUMBER
+    med_line_search = _RE_MED_LINE.search
 
-    for line in text.splitlines():
+    for line in lines:
         line_orig = line.strip()
         if not line_orig:
             continue
 
         # quick filter: only consider lines that contain medication-related tokens or dosage patterns
-        if not (re.search(r'\b(mg|tablet|tab|capsule|ml|syrup|syp|cream|ointment|vial|bottle|suppository|injection)\b', line_orig, re.IGNORECASE)
-                or dosage_re.search(line_orig)):
+        if not med_line_search(line_orig):
             continue
 
         line_proc = leading_code_re.sub('', line_orig)  # remove product codes at start
@@ -311,7 +649,9 @@ def find_medications(text: str) -> list:
             if qm:
                 quantity = qm.group(1)
                 # append unit where appropriate (e.g., "1 tablet")
-                if unit and not re.search(r'\d+\s*' + re.escape(unit), line_proc, re.IGNORECASE):
+                # lower() can map an IGNORECASE match outside the precompiled set (e.g. "OİNTMENT")
+                unit_qty_re = _RE_UNIT_QUANTITY.get(unit) or re.compile(r'\d+\s*' + re.escape(unit), re.IGNORECASE)
+                if unit and not unit_qty_re.search(line_proc):
                     quantity = f"{quantity} {unit}"
         # fallback: first small integer in the whole line (but avoid picking prices with 4+ digits)
         if not quantity:
@@ -330,15 +670,13 @@ def find_medications(text: str) -> list:
             name_candidate = dosage_re.sub('', name_candidate)
         if unit_m:
             name_candidate = unit_re.sub('', name_candidate)
-        # remove standalone small numbers and long numbers (prices)
-        name_candidate = re.sub(r'\b\d{1,3}\b', '', name_candidate)
-        name_candidate = re.sub(r'\b\d{4,}\b', '', name_candidate)
-        # remove punctuation and extra whitespace
-        name_candidate = re.sub(r'[_\t\|:,\(\)\[\]\-\\/]+', ' ', name_candidate)
-        name_candidate = re.sub(r'\s+', ' ', name_candidate).strip()
+        # remove standalone numbers (quantities, prices)
+        name_candidate = _RE_STANDALONE_NUMBER.sub('', name_candidate)
+        # remove punctuation (inner whitespace is collapsed by the split below)
+        name_candidate = _RE_NAME_SEPARATORS.sub(' ', name_candidate).strip()
 
         # If name still contains product-like tokens, try to drop leading product codes/IDs again
-        name_candidate = leading_code_re.sub('', name_candidate).strip()
+        name_candidate = leading_code_re.sub('', name_candidate)
 
         # Normalize casing: prefer Title Case for names, but keep common ALL-CAPS cleaned
         name = " ".join([w.capitalize() for w in name_candidate.split()]) if name_candidate else ""
@@ -358,7 +696,7 @@ def find_medications(text: str) -> list:
         })
 
     # Additional pattern-based captures for inline forms like "Paracetamol 500mg 10 tablets"
-    for m in re.finditer(r'([A-Za-z][A-Za-z \-]{1,40})\s+(\d{1,4}\s*(?:mg|g|ml|mcg|iu))\s+(\d{1,3})\s*(tablets?|tabs|capsules?)', text, re.IGNORECASE):
+    for m in _RE_INLINE_MED.finditer(text):
         name = " ".join(w.capitalize() for w in m.group(1).split())
         dosage = m.group(2).lower().replace(' ', '')
         quantity = f"{m.group(3)} {m.group(4)}"
@@ -370,7 +708,12 @@ def find_medications(text: str) -> list:
     return meds
 
 
-def find_procedures(text: str) -> list:
+def find_medications(text: str) -> list:
+    """find_medications_in_lines for a whole text."""
+    return find_medications_in_lines(text.splitlines(), text)
+
+
+def find_procedures_in_lines(lines: List[str]) -> list:
     """Extract procedure lines but exclude lines that are numeric or that leave no alphabetic content after removing numbers.
 
     Rules:
@@ -382,37 +725,43 @@ def find_procedures(text: str) -> list:
     - Deduplicate results while preserving order.
     """
     procedures = []
-    facility_re = re.compile(r'\b(hospital|clinic|medical center|centre|facility|ward|department)\b', re.IGNORECASE)
-    proc_re = re.compile(r'\b(test|x-?ray|scan|procedure|operation|surgery|lab|consultation|nursing care|medication)\b', re.IGNORECASE)
+    proc_re = _RE_PROC
+    trailing_colon_search = _RE_TRAILING_COLON.search
 
-    for line in text.splitlines():
+    for line in lines:
         line_clean = line.strip()
         if not line_clean:
             continue
+        # cheap substring check first: most lines contain no procedure keyword at all
+        # (ASCII only: lower() and IGNORECASE disagree on e.g. "CONSULTATİON")
+        if line_clean.isascii():
+            line_lower = line_clean.lower()
+            if not any(k in line_lower for k in _PROC_FAST):
+                continue
         # skip lines that are form labels/questions (end with colon) — these are not procedures
-        if re.search(r':\s*$', line_clean):
+        if trailing_colon_search(line_clean):
             continue
         # ignore facility headers
-        if facility_re.search(line_clean):
+        if _is_facility_line(line_clean):
             continue
-        # only consider lines with procedure keywords
+        # only consider lines with procedure keywords (as whole words)
         if not proc_re.search(line_clean):
             continue
 
         # If line contains digits, remove numeric/date tokens and punctuation,
         # then verify there's alphabetic content left to keep.
-        if re.search(r'\d', line_clean):
+        if _RE_DIGIT.search(line_clean):
             # remove common date/number characters and punctuation
-            cleaned = re.sub(r'[\d\-/:\.,]', ' ', line_clean)
+            cleaned = _RE_PROC_NUMERIC.sub(' ', line_clean)
             # remove leftover non-word characters except spaces/hyphens/apostrophes
-            cleaned = re.sub(r"[^\w\s\-'`]", '', cleaned).strip()
+            cleaned = _RE_PROC_PUNCT.sub('', cleaned).strip()
             # collapse whitespace
-            cleaned = re.sub(r'\s+', ' ', cleaned)
+            cleaned = _RE_WHITESPACE.sub(' ', cleaned)
             # skip if cleaned ends with a colon (defensive)
-            if re.search(r':\s*$', cleaned):
+            if trailing_colon_search(cleaned):
                 continue
             # ensure there's alphabetic content (not just words like 'Name' or 'Date')
-            if not re.search(r'[A-Za-z]', cleaned):
+            if not _RE_ALPHA.search(cleaned):
                 continue
             # avoid lines that are too short after cleaning
             if len(cleaned.split()) < 2:
@@ -433,7 +782,12 @@ def find_procedures(text: str) -> list:
     return result
 
 
-def find_admission(text: str) -> dict:
+def find_procedures(text: str) -> list:
+    """find_procedures_in_lines for a whole text."""
+    return find_procedures_in_lines(text.splitlines())
+
+
+def find_admission_in_lines(lines: List[str]) -> dict:
     """Determine admission and extract dates only from lines that reference admission/discharge.
 
     This avoids picking random dates from the document.
@@ -441,15 +795,18 @@ def find_admission(text: str) -> dict:
     was_admitted = False
     admission_date = None
     discharge_date = None
+    saw_discharge = False
 
     # Look for lines that contain admission/discharge keywords and dates on those lines
-    for line in text.splitlines():
-        if re.search(r'\b(admit|admitted|admission|discharge|discharged)\b', line, re.IGNORECASE):
+    for line in lines:
+        if _RE_ADMIT_OR_DISCHARGE.search(line):
             # mark admission presence
-            if re.search(r'\b(admit|admitted|admission)\b', line, re.IGNORECASE):
+            if _RE_ADMITTED.search(line):
                 was_admitted = True
+            else:
+                saw_discharge = True
             # find dates on this line
-            date_matches = re.findall(DATE_REGEX, line)
+            date_matches = _RE_DATE.findall(line)
             # DATE_REGEX can produce tuples if grouped; normalize to strings
             normalized = []
             for d in date_matches:
@@ -468,7 +825,7 @@ def find_admission(text: str) -> dict:
                 elif not discharge_date and len(normalized) > 1:
                     discharge_date = normalized[1]
     # final conservative check: if was_admitted not found but 'discharge' appears elsewhere, mark admitted
-    if not was_admitted and re.search(r'\b(discharge|discharged)\b', text, re.IGNORECASE):
+    if not was_admitted and saw_discharge:
         was_admitted = True
     return {
         "was_admitted": was_admitted,
@@ -477,7 +834,23 @@ def find_admission(text: str) -> dict:
     }
 
 
-def find_total_amount(text: str) -> Optional[str]:
+def find_admission(text: str) -> dict:
+    """find_admission_in_lines for a whole text."""
+    return find_admission_in_lines(text.splitlines())
+
+
+def _parse_amount_number(s: str) -> Optional[float]:
+    """Parse an amount token such as "₦4,500" or "NGN 1,200.50" into a float, or None."""
+    if not s:
+        return None
+    s = _RE_NON_NUMERIC.sub('', s)  # remove commas, currency symbols, NGN text
+    try:
+        return float(s) if s else None
+    except ValueError:
+        return None
+
+
+def find_total_amount_in_lines(lines: List[str]) -> Optional[str]:
     """Robust total/amount extractor.
 
     Strategy:
@@ -486,49 +859,19 @@ def find_total_amount(text: str) -> Optional[str]:
     3) If still not found, collect all numeric/currency-looking lines and return the largest value (heuristic: totals are usually the largest amount).
     4) Normalize NGN to ₦ where applicable.
     """
-    LABELS = [
-        r'net\s+(?:amount|value|total|payable|amt)',
-        r'total\s+(?:amount|value|payable|due|bill)',
-        r'final\s+(?:amount|total|payment|value)',
-        r'grand\s+total',
-        r'bill(?:ing)?\s+(?:amount|total)',
-        r'invoice\s+(?:amount|total|value)',
-        r'amount\s+(?:due|payable)',
-        r'balance\s+(?:due|payable)',
-        r'sub\s*total',
-        r'net\s+value',
-        r'net\s+amt',
-        r'payable\s+amount'
-    ]
-    label_re = re.compile(r'\b(' + r'|'.join(LABELS) + r')\b', re.IGNORECASE)
-
-    # Matches explicit currency patterns (₦ or NGN) or numbers with commas/decimals
-    AMOUNT_CAPTURE_RE = re.compile(r'(₦\s?[\d,]+(?:\.\d+)?|NGN\s?[\d,]+(?:\.\d+)?|[\d,]+\.\d+|[\d,]+(?:\b))', re.IGNORECASE)
-    # Line that is mostly an amount (only currency/number characters)
-    AMOUNT_ONLY_LINE_RE = re.compile(r'^\s*(?:₦\s?[\d,]+(?:\.\d+)?|NGN\s?[\d,]+(?:\.\d+)?|[\d,]+(?:\.\d+)?)\s*$', re.IGNORECASE)
-
-    def parse_number(s: str) -> Optional[float]:
-        if not s:
-            return None
-        s = s.strip()
-        has_ngn = bool(re.search(r'\bNGN\b', s, re.IGNORECASE))
-        s = re.sub(r'[^\d\.]', '', s)  # remove commas, currency symbols, NGN text
-        try:
-            return float(s) if s else None
-        except Exception:
-            return None
-
-    lines = [ln.rstrip() for ln in text.splitlines() if ln.strip()]
+    parse_number = _parse_amount_number
+    facility_search = _is_facility_line
+    lines = [ln.rstrip() for ln in lines if ln.strip()]
     # 1) Look for labelled lines first (same-line amount)
     for i, line in enumerate(lines):
-        if re.search(r'\b(hospital|clinic|medical center|centre|facility|ward|department)\b', line, re.IGNORECASE):
+        if facility_search(line):
             continue
-        if label_re.search(line):
-            m = AMOUNT_CAPTURE_RE.search(line)
+        if _RE_TOTAL_LABEL.search(line):
+            m = _RE_AMOUNT_CAPTURE.search(line)
             if m:
                 val = m.group(1).strip()
                 # normalize NGN -> ₦
-                if re.search(r'\bNGN\b', val, re.IGNORECASE) and not val.startswith('₦'):
+                if _RE_NGN.search(val) and not val.startswith('₦'):
                     num = parse_number(val)
                     return f"₦{int(num):,}" if num and num.is_integer() else f"₦{num:,}" if num else val
                 return val
@@ -537,61 +880,67 @@ def find_total_amount(text: str) -> Optional[str]:
             j = i + 1
             while j < len(lines) and not lines[j].strip():
                 j += 1
-            if j < len(lines) and AMOUNT_ONLY_LINE_RE.match(lines[j]):
-                m2 = AMOUNT_CAPTURE_RE.search(lines[j])
+            if j < len(lines) and _RE_AMOUNT_ONLY_LINE.match(lines[j]):
+                m2 = _RE_AMOUNT_CAPTURE.search(lines[j])
                 if m2:
                     val = m2.group(1).strip()
-                    if re.search(r'\bNGN\b', val, re.IGNORECASE) and not val.startswith('₦'):
+                    if _RE_NGN.search(val) and not val.startswith('₦'):
                         num = parse_number(val)
                         return f"₦{int(num):,}" if num and num.is_integer() else f"₦{num:,}" if num else val
                     return val
 
     # 2) Look for standalone amount-only lines that follow "sum/subtotal/total" words on previous line
     for i, line in enumerate(lines):
-        if AMOUNT_ONLY_LINE_RE.match(line):
+        if _RE_AMOUNT_ONLY_LINE.match(line):
             prev = lines[i-1] if i-1 >= 0 else ""
-            if re.search(r'\b(sum|subtotal|total|net|amount|payable|due|grand)\b', prev, re.IGNORECASE):
-                m = AMOUNT_CAPTURE_RE.search(line)
+            if _RE_TOTAL_CONTEXT.search(prev):
+                m = _RE_AMOUNT_CAPTURE.search(line)
                 if m:
                     val = m.group(1).strip()
-                    if re.search(r'\bNGN\b', val, re.IGNORECASE) and not val.startswith('₦'):
+                    if _RE_NGN.search(val) and not val.startswith('₦'):
                         num = parse_number(val)
                         return f"₦{int(num):,}" if num and num.is_integer() else f"₦{num:,}" if num else val
                     return val
 
     # 3) Fallback: gather all amount-like tokens and choose the largest numeric value (heuristic)
-    candidates = []
-    for i, line in enumerate(lines):
-        if re.search(r'\b(hospital|clinic|medical center|centre|facility|ward|department)\b', line, re.IGNORECASE):
+    # keep only the highest numeric value seen so far (likely the total); the earliest wins ties
+    top_num = float("-inf")
+    top_token = None
+    amount_finditer = _RE_AMOUNT_CAPTURE.finditer
+    for line in lines:
+        if facility_search(line):
             continue
-        for m in AMOUNT_CAPTURE_RE.finditer(line):
+        for m in amount_finditer(line):
             token = m.group(1).strip()
             num = parse_number(token)
-            if num is None:
-                continue
-            candidates.append((num, token, i))
-    if candidates:
-        # pick highest numeric value (likely the total)
-        candidates.sort(key=lambda x: x[0], reverse=True)
-        top_num, top_token, top_idx = candidates[0]
+            if num is not None and num > top_num:
+                top_num, top_token = num, token
+    if top_token is not None:
         # normalize NGN -> ₦ if NGN present anywhere nearby or in token
-        if re.search(r'\bNGN\b', text, re.IGNORECASE) and not top_token.startswith('₦'):
+        if any(map(_RE_NGN.search, lines)) and not top_token.startswith('₦'):
             return f"₦{int(top_num):,}" if top_num.is_integer() else f"₦{top_num:,}"
         return top_token
 
     return None
 
 
+def find_total_amount(text: str) -> Optional[str]:
+    """find_total_amount_in_lines for a whole text."""
+    return find_total_amount_in_lines(text.splitlines())
+
+
 def parse_text_to_structure(text: str) -> Dict[str, Any]:
+    # split once and share the lines between all extractors
+    lines = text.splitlines()
     # extract patient first, then member with exclusion to avoid mixing
-    patient_name = find_patient_name(text)
-    member_name = find_member_name(text, exclude_name=patient_name)
-    age = find_age(text)
+    patient_name = find_patient_name_in_lines(lines)
+    member_name = find_member_name_in_lines(lines, exclude_name=patient_name)
+    age = find_age_in_lines(lines, text)
     diagnoses = find_diagnoses(text)
-    medications = find_medications(text)
-    procedures = find_procedures(text)
-    admission = find_admission(text)
-    total_amount = find_total_amount(text)
+    medications = find_medications_in_lines(lines, text)
+    procedures = find_procedures_in_lines(lines)
+    admission = find_admission_in_lines(lines)
+    total_amount = find_total_amount_in_lines(lines)
 
     # include both patient and member name separately to avoid mixing
     return {
@@ -605,32 +954,112 @@ def parse_text_to_structure(text: str) -> Dict[str, Any]:
     }
 
 
+def parse_text_cached(text: str) -> Dict[str, Any]:
+    """parse_text_to_structure with results cached by a hash of the text.
+
+    Re-uploads of the same document produce the same OCR text, so their parse is a
+    dictionary lookup. Callers get their own copy of the cached structure.
+    """
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with _PARSE_CACHE_LOCK:
+        structure = _PARSE_CACHE.get(key)
+        if structure is not None:
+            _PARSE_CACHE.move_to_end(key)
+    if structure is None:
+        structure = parse_text_to_structure(text)
+        with _PARSE_CACHE_LOCK:
+            _PARSE_CACHE[key] = structure
+            while len(_PARSE_CACHE) > PARSE_CACHE_MAX_SIZE:
+                _PARSE_CACHE.popitem(last=False)
+    return copy.deepcopy(structure)
+
+
 # --- API models ---
 class AskRequest(BaseModel):
     document_id: str
     question: Optional[str] = None
 
 
+async def _run_ocr(file_obj: BinaryIO, filename: str) -> str:
+    """OCR an uploaded image or PDF on OCR_POOL, keeping the event loop responsive."""
+    ocr = ocr_from_pdf_file if filename.lower().endswith(".pdf") else ocr_from_image_file
+    return await asyncio.get_running_loop().run_in_executor(OCR_POOL, ocr, file_obj)
+
+
+async def _extract_pipeline(doc_id: str, file_obj: BinaryIO, filename: str) -> None:
+    """Background OCR + parse for POST /extract/async; records the outcome in the document store."""
+    try:
+        text = await _run_ocr(file_obj, filename)
+    except Exception as e:
+        store_document(doc_id, None, status="failed", error=f"OCR failed: {e}")
+        return
+    finally:
+        file_obj.close()
+    try:
+        # parse off the event loop too (default executor, so it does not queue behind OCR jobs)
+        structure = await asyncio.get_running_loop().run_in_executor(None, parse_text_cached, text)
+    except Exception as e:
+        store_document(doc_id, None, raw_text=text, status="failed", error=f"Parsing failed: {e}")
+        return
+    store_document(doc_id, structure, raw_text=text)
+
+
 # --- Endpoints ---
 @app.post("/extract")
 async def extract(file: UploadFile = File(...)):
     """Accept an uploaded image or PDF and return structured JSON extracted from it."""
-    content = await file.read()
     try:
-        if file.filename.lower().endswith(".pdf"):
-            text = ocr_from_pdf_bytes(content)
-        else:
-            text = ocr_from_image_bytes(content)
+        # Hand the spooled upload file straight to OCR instead of reading the whole body into memory
+        text = await _run_ocr(file.file, file.filename)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"OCR failed: {e}")
 
-    structure = parse_text_to_structure(text)
+    structure = parse_text_cached(text)
     doc_id = str(uuid4())
-    DOCUMENT_STORE[doc_id] = {"raw_text": text, "structure": structure}
+    store_document(doc_id, structure, raw_text=text)
 
     return JSONResponse({"document_id": doc_id, "structure": structure})
 
 
+@app.post("/extract/async")
+async def extract_async(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """Accept an uploaded image or PDF and process it in the background.
+
+    Returns 202 with the document_id straight away; poll GET /extract/{document_id}
+    for the structure. Suited to large, multi-page PDFs.
+    """
+    # The upload is closed once the response is sent, so copy it to a temporary file the task owns
+    upload_copy = tempfile.TemporaryFile()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, shutil.copyfileobj, file.file, upload_copy)
+        upload_copy.seek(0)
+    except BaseException:
+        # e.g. the client disconnected mid-upload; the task never takes ownership of the copy
+        upload_copy.close()
+        raise
+
+    doc_id = str(uuid4())
+    store_document(doc_id, None, status="processing")
+    background_tasks.add_task(_extract_pipeline, doc_id, upload_copy, file.filename)
+
+    return JSONResponse({"document_id": doc_id, "status": "processing"}, status_code=202)
+
+
+@app.get("/extract/{document_id}")
+async def extract_status(document_id: str):
+    """Return the processing status (and, once ready, the structure) of a document."""
+    doc = get_document(document_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="document_id not found")
+
+    response = {"document_id": document_id, "status": doc["status"]}
+    if doc["status"] == "ready":
+        response["structure"] = doc["structure"]
+    elif doc["status"] == "failed":
+        response["error"] = doc.get("error")
+    return JSONResponse(response)
+
+
 @app.post("/ask")
 async def ask(req: AskRequest):
     """Answer questions about a previously extracted document.
@@ -639,15 +1068,17 @@ async def ask(req: AskRequest):
     processing the request and will override any incoming question with a
     fixed internal question. (This logic is implemented below.)
     """
-    # Pause exactly 2 seconds before processing
-    sleep(2)
+    # Pause exactly 2 seconds before processing (without blocking the event loop)
+    await asyncio.sleep(2)
 
     # Override the incoming question with the fixed internal question
     question = "What medication is used and why?"
 
-    doc = DOCUMENT_STORE.get(req.document_id)
+    doc = get_document(req.document_id)
     if not doc:
         raise HTTPException(status_code=404, detail="document_id not found")
+    if doc["status"] != "ready":
+        raise HTTPException(status_code=409, detail=f"document is {doc['status']}")
 
     structure = doc.get("structure", {})
 
@@ -664,12 +1095,8 @@ async def ask(req: AskRequest):
             name = m.get("name", "").strip()
             dosage = m.get("dosage", "")
             qty = m.get("quantity", "")
-            searchable = name.lower()
-            purpose = None
-            for key, val in _DIGIT_WORDS.items():
-                if key in searchable:
-                    purpose = val
-                    break
+            m_purpose = _RE_PURPOSE.search(name)
+            purpose = _DIGIT_WORDS[m_purpose.group(0).lower()] if m_purpose else None
             if not purpose:
                 # try to infer from diagnoses
                 if diagnoses: